@@ -3,27 +3,55 @@
 """
 
 import argparse
+import concurrent.futures
+import copy
+import functools
 import os
 import json
 import logging
+import queue
+import shlex
+import threading
+import uuid
 
-from pyclowder.utils import setup_logging as do_setup_logging
-from terrautils.extractors import load_json_file as do_load_json_file
-from terrautils.formats import create_geotiff as do_create_geotiff
-from terrautils.metadata import get_terraref_metadata as do_get_terraref_metadata, \
-    get_season_and_experiment as do_get_season_and_experiment
-from terrautils.spatial import geojson_to_tuples as do_geojson_to_tuples
-from terrautils.sensors import Sensors
-import terraref.stereo_rgb
-import terrautils.lemnatec
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-terrautils.lemnatec.SENSOR_METADATA_CACHE = os.path.dirname(os.path.realpath(__file__))
+# The terrautils, terraref, GDAL, and pyclowder modules are slow to load and are imported
+# by the functions that use them
+
+# Folder containing the sensor metadata used by terrautils
+SENSOR_METADATA_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+# Let GDAL use all the cores and a larger block cache when writing GeoTIFFs
+os.environ.setdefault('GDAL_NUM_THREADS', 'ALL_CPUS')
+os.environ.setdefault('GDAL_CACHEMAX', '512')
 
 SELF_DESCRIPTION = "Maricopa agricultural gantry bin to geotiff converter"
 
 EXTRACTOR_NAME = 'stereoTop'
 EXTRCTOR_VERSION = "1.0"
 
+# Creation options for the tiled and compressed GeoTIFFs we generate
+GEOTIFF_TILE_OPTIONS = ['TILED=YES', 'BLOCKXSIZE=512', 'BLOCKYSIZE=512']
+
+# Set the USE_NUMBA_UNPACK environment variable to convert bin files with the Numba compiled code
+USE_NUMBA_UNPACK = os.getenv('USE_NUMBA_UNPACK', '').lower() in ['1', 'true', 'yes', 'on']
+
+# RGB image buffers reused by the Numba bin conversion, keyed by image (width, height) and buffer slot
+_OUT_BUF = {}
+
+# The number of converted images a batch worker can have waiting to be written as geotiffs
+BATCH_WRITE_QUEUE_SIZE = 2
+
+# Maps the suffix of a bin file's name to the side of the stereo camera it's from
+BIN_TYPES = {'left': 'left', 'right': 'right'}
+
+# Supported GeoTIFF compression types, the first one is the default
+COMPRESSION_TYPES = ['zstd', 'jpeg', 'lzw']
+
 def get_metadata_timestamp(metadata: dict) -> str:
     """Looks up the timestamp in the metadata
     Arguments:
@@ -44,6 +72,155 @@ def get_metadata_timestamp(metadata: dict) -> str:
 
     return timestamp
 
+def compress_geotiff(source_path: str, dest_path: str, compression: str = COMPRESSION_TYPES[0]) -> None:
+    """Writes a tiled, compressed copy of a GeoTIFF. ZSTD compression falls back to LZW
+       when the installed GDAL doesn't support it
+    Arguments:
+        source_path: the path to the uncompressed GeoTIFF
+        dest_path: the path of the compressed GeoTIFF to write
+        compression: one of the COMPRESSION_TYPES values; 'jpeg' expects 8-bit RGB pixels
+    """
+    from osgeo import gdal
+
+    driver = gdal.GetDriverByName('GTiff')
+    source = gdal.Open(source_path)
+    try:
+        # Compress with as many threads as GDAL has been allowed to use
+        options = GEOTIFF_TILE_OPTIONS + ['NUM_THREADS=' + os.environ.get('GDAL_NUM_THREADS', 'ALL_CPUS')]
+        if compression == 'jpeg':
+            options.extend(['COMPRESS=JPEG', 'PHOTOMETRIC=YCBCR', 'JPEG_QUALITY=85', 'INTERLEAVE=PIXEL'])
+        else:
+            # Horizontal differencing suits integer pixels, floating point pixels need their own predictor
+            is_float = source.GetRasterBand(1).DataType in (gdal.GDT_Float32, gdal.GDT_Float64)
+            options.append('PREDICTOR=3' if is_float else 'PREDICTOR=2')
+            if compression == 'zstd' and 'ZSTD' not in (driver.GetMetadataItem('DMD_CREATIONOPTIONLIST') or ''):
+                logging.debug("ZSTD compression is not available, using LZW instead")
+                compression = 'lzw'
+            if compression == 'zstd':
+                options.extend(['COMPRESS=ZSTD', 'ZSTD_LEVEL=1'])
+            else:
+                options.append('COMPRESS=LZW')
+        dest = driver.CreateCopy(dest_path, source, strict=0, options=options)
+        if dest is None:
+            raise RuntimeError("Unable to write compressed GeoTIFF '%s'" % dest_path)
+        dest.FlushCache()
+        dest = None
+    finally:
+        source = None
+
+def _fast_load_json(filename: str):
+    """Loads the JSON from the file, using orjson for local files when it's available
+    Arguments:
+        filename: the path of the JSON file to load
+    Return:
+        Returns the loaded JSON, or None if the file couldn't be loaded
+    """
+    from terrautils.extractors import load_json_file as do_load_json_file
+
+    if not orjson or not os.path.isfile(filename):
+        return do_load_json_file(filename)
+
+    try:
+        with open(filename, 'rb') as in_file:
+            return orjson.loads(in_file.read())
+    except orjson.JSONDecodeError:
+        # orjson rejects NaN and Infinity which the standard json module accepts
+        logging.debug("Falling back to the standard JSON loader for '%s'", filename)
+        return do_load_json_file(filename)
+    except OSError as ex:
+        logging.error("Could not load JSON file '%s': %s", filename, str(ex))
+    return None
+
+def write_json_file(path: str, data: dict, skipkeys: bool = False, indent: bool = True) -> None:
+    """Writes the data to the file as JSON, using orjson when it's available
+    Arguments:
+        path: the path of the file to write
+        data: the data to write
+        skipkeys: skip dictionary keys that aren't basic types instead of raising an exception
+        indent: write indented JSON when True, compact JSON otherwise
+    """
+    if orjson:
+        options = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_NON_STR_KEYS if skipkeys else 0)
+        try:
+            encoded = orjson.dumps(data, option=options)
+        except orjson.JSONEncodeError:
+            # Fall back to json for keys or values orjson can't handle (such as tuple keys to skip)
+            encoded = None
+        if encoded is not None:
+            with open(path, 'wb') as out_file:
+                out_file.write(encoded)
+            return
+
+    with open(path, 'w') as out_file:
+        json.dump(data, out_file, indent=2 if indent else None, skipkeys=skipkeys)
+
+@functools.lru_cache(maxsize=1)
+def get_geotiff_sensor():
+    """Returns the terrautils Sensors instance for the generated geotiffs, only created once
+    """
+    from terrautils.sensors import Sensors
+    return Sensors(base='', station='ua-mac', sensor='rgb_geotiff')
+
+def get_image_buffer(bin_shape: tuple, slot: int = 0):
+    """Returns the reusable RGB image buffer for bin files of the specified shape, allocating it
+       on first use
+    Arguments:
+        bin_shape: the (width, height) of the bin image
+        slot: which of the buffers for the shape to return, images that are in use at the same time
+              need different slots
+    """
+    key = (bin_shape, slot)
+    if key not in _OUT_BUF:
+        import numpy as np
+        _OUT_BUF[key] = np.empty((bin_shape[0], bin_shape[1], 3), np.uint8)
+    return _OUT_BUF[key]
+
+def convert_bin(bin_shape: tuple, filename: str, buffer_slot: int = 0):
+    """Converts the bin file to an RGB image, using the Numba compiled conversion when USE_NUMBA_UNPACK is set
+    Arguments:
+        bin_shape: the (width, height) of the bin image
+        filename: the path to the .bin file
+        buffer_slot: the reusable image buffer to convert into when using the Numba conversion
+    Return:
+        Returns the RGB image
+    """
+    if USE_NUMBA_UNPACK:
+        import stereo_rgb_fast
+        return stereo_rgb_fast.process_raw(bin_shape, filename, None, out=get_image_buffer(bin_shape, buffer_slot))
+
+    import terraref.stereo_rgb
+    return terraref.stereo_rgb.process_raw(bin_shape, filename, None)
+
+def write_geotiff(image, gps_bounds: tuple, tiff_path: str, compression: str, extractor_info: dict,
+                  terra_md: dict) -> None:
+    """Writes the converted image as a compressed geotiff
+    Arguments:
+        image: the RGB image to write
+        gps_bounds: the GPS bounds of the image
+        tiff_path: the path of the geotiff to write
+        compression: the compression to use for the geotiff, one of COMPRESSION_TYPES
+        extractor_info: the extractor information to store in the geotiff
+        terra_md: the TERRA REF metadata to store in the geotiff
+    """
+    from osgeo import gdal
+    from terrautils.formats import create_geotiff as do_create_geotiff
+
+    if compression == 'jpeg' and (image.dtype != 'uint8' or image.ndim != 3 or image.shape[2] != 3):
+        logging.warning("JPEG compression needs an 8-bit RGB image, using ZSTD compression instead")
+        compression = 'zstd'
+    # JPEG compression works on 8-bit pixels, everything else keeps the floating point image
+    as_float = compression != 'jpeg'
+
+    # Keep the uncompressed image in GDAL's in-memory file system so only the compressed one touches the disk
+    temp_path = '/vsimem/bin2tif_%s.tif' % uuid.uuid4().hex
+    try:
+        do_create_geotiff(image, gps_bounds, temp_path, None, as_float,
+                          extractor_info, terra_md, compress=False)
+        compress_geotiff(temp_path, tiff_path, compression)
+    finally:
+        if gdal.VSIStatL(temp_path) is not None:
+            gdal.Unlink(temp_path)
+
 def save_result(working_space: str, result: dict) -> None:
     """Saves the result dictionary as JSON to a well known location in the
        working space folder. Relative to the working space folder, the JSON
@@ -52,15 +229,13 @@ def save_result(working_space: str, result: dict) -> None:
         working_space: path to our working space
         result: dictionary containing the results of a run
     """
-    result_path = os.path.join(working_space, 'output')
-    if not os.path.exists(result_path):
-        os.makedirs(result_path)
-    result_path = os.path.join(result_path, 'result.json')
+    os.makedirs(os.path.join(working_space, 'output'), exist_ok=True)
+    result_path = os.path.join(working_space, 'output', 'result.json')
     logging.info("Storing result at location: '%s'", result_path)
-    logging.debug("Result: %s", str(result))
+    logging.debug("Result: %r", result)
 
-    with open(result_path, 'w') as out_file:
-        json.dump(result, out_file, indent=2)
+    # Only make the results easy to read when debugging
+    write_json_file(result_path, result, indent=logging.getLogger().isEnabledFor(logging.DEBUG))
 
 
 def args_to_params(args: list) -> dict:
@@ -74,35 +249,95 @@ def args_to_params(args: list) -> dict:
     found['filename'] = args.bin_file
     found['metadata'] = args.metadata_file
     found['working_space'] = args.working_space
+    found['compression'] = args.compress
 
     # Note: Return an empty dict if we're missing mandatory parameters
     return found
 
-def bin2tif(filename: str, metadata: str, working_space: str) -> dict:
+def load_batch_manifest(manifest: str, min_fields: int, max_fields: int) -> list:
+    """Loads the lines of a batch manifest file. Each line has the fields of one work item, separated by
+       whitespace with shell style quoting. Blank lines and lines starting with '#' are ignored
+    Arguments:
+        manifest: the path to the manifest file
+        min_fields: the minimum number of fields on a line
+        max_fields: the maximum number of fields on a line
+    Return:
+        Returns the list of fields found on each valid line
+    """
+    items = []
+    with open(manifest, 'r') as in_file:
+        for line_num, line in enumerate(in_file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = shlex.split(line)
+            if not min_fields <= len(fields) <= max_fields:
+                logging.error("Skipping manifest line %s: expected %s to %s fields, found %s",
+                              str(line_num), str(min_fields), str(max_fields), str(len(fields)))
+                continue
+            items.append(fields)
+    return items
+
+def bin2tif(filename: str, metadata: str, working_space: str, compression: str = COMPRESSION_TYPES[0],
+            geotiff_writer=None, buffer_slot: int = 0) -> dict:
     """Converts the bin file to a geotiff file
     ArgumentsL
         filename: the path to the .bin file
         metadata: the path to the cleaned metadata file
         working_space: the path to our working space
+        compression: the compression to use for the geotiff, one of COMPRESSION_TYPES
+        geotiff_writer: optional replacement for write_geotiff(), called with the same keyword arguments
+        buffer_slot: the reusable image buffer to convert into when using the Numba conversion
     """
-    result = {}
-
-    loaded_json = do_load_json_file(metadata)
+    loaded_json = _fast_load_json(metadata)
     if not loaded_json:
         msg = "Unable to load JSON from file '%s'" % metadata
         logging.error(msg)
         logging.error("    JSON may be missing or invalid. Returning an error")
+        return {'error': {'message': msg}, 'code': -1}
+
+    return bin2tif_from_dict(filename, loaded_json, working_space, compression, metadata,
+                             geotiff_writer, buffer_slot)
+
+def bin2tif_from_dict(filename: str, parsed_md: dict, working_space: str, compression: str = COMPRESSION_TYPES[0],
+                      metadata_name: str = None, geotiff_writer=None, buffer_slot: int = 0) -> dict:
+    """Converts the bin file to a geotiff file using metadata that's already been loaded
+    Arguments:
+        filename: the path to the .bin file
+        parsed_md: the cleaned metadata, it's not changed
+        working_space: the path to our working space
+        compression: the compression to use for the geotiff, one of COMPRESSION_TYPES
+        metadata_name: optional name of the metadata's source for messages
+        geotiff_writer: optional replacement for write_geotiff(), called with the same keyword arguments
+        buffer_slot: the reusable image buffer to convert into when using the Numba conversion
+    """
+    import terraref.stereo_rgb
+    import terrautils.lemnatec
+    import terrautils.metadata
+    import terrautils.spatial
+    terrautils.lemnatec.SENSOR_METADATA_CACHE = SENSOR_METADATA_FOLDER
+
+    result = {}
+    if metadata_name is None:
+        metadata_name = "metadata for '%s'" % filename
+
+    if not parsed_md:
+        msg = "No metadata provided for '%s'" % filename
+        logging.error(msg)
+        logging.error("    Returning an error")
         result['error'] = {'message': msg}
         result['code'] = -1
         return result
 
-    if 'content' in loaded_json:
-        parse_json = loaded_json['content']
+    # The metadata is updated for this file below, work on a copy so callers can reuse theirs for other files
+    parsed_md = copy.deepcopy(parsed_md)
+    if 'content' in parsed_md:
+        parse_json = parsed_md['content']
     else:
-        parse_json = loaded_json
-    terra_md_full = do_get_terraref_metadata(parse_json, EXTRACTOR_NAME)
+        parse_json = parsed_md
+    terra_md_full = terrautils.metadata.get_terraref_metadata(parse_json, EXTRACTOR_NAME)
     if not terra_md_full:
-        msg = "Unable to find %s metadata in JSON file '%s'" % (EXTRACTOR_NAME, metadata)
+        msg = "Unable to find %s metadata in JSON file '%s'" % (EXTRACTOR_NAME, metadata_name)
         logging.error(msg)
         logging.error("    JSON may be missing or invalid. Returning an error")
         result['error'] = {'message': msg}
@@ -119,7 +354,7 @@ def bin2tif(filename: str, metadata: str, working_space: str) -> dict:
         return result
 
         # Fetch experiment name from terra metadata
-    _, _, updated_experiment = do_get_season_and_experiment(timestamp, 'stereoTop', terra_md_full)
+    _, _, updated_experiment = terrautils.metadata.get_season_and_experiment(timestamp, 'stereoTop', terra_md_full)
 #        if None in [season_name, experiment_name]:
 #            raise ValueError("season and experiment could not be determined")
 #
@@ -131,10 +366,12 @@ def bin2tif(filename: str, metadata: str, working_space: str) -> dict:
 #                                              timestamp[:4], timestamp[5:7], timestamp[8:10],
 #                                              leaf_ds_name=self.sensors.get_display_name() + ' - ' + timestamp)
 
-    sensor = Sensors(base='', station='ua-mac', sensor='rgb_geotiff')
+    sensor = get_geotiff_sensor()
     leaf_name = sensor.get_display_name()
 
-    bin_type = 'left' if filename.endswith('_left.bin') else 'right' if filename.endswith('_right.bin') else None
+    bin_stem, bin_ext = os.path.splitext(os.path.basename(filename))
+    stem_parts = bin_stem.rsplit('_', 1)
+    bin_type = BIN_TYPES.get(stem_parts[1]) if bin_ext == '.bin' and len(stem_parts) == 2 else None
     if not bin_type:
         msg = "Bin file must be a left or right file: '%s'" % filename
         logging.error(msg)
@@ -143,17 +380,18 @@ def bin2tif(filename: str, metadata: str, working_space: str) -> dict:
         result['code'] = -4
         return result
 
-    terra_md_trim = do_get_terraref_metadata(parse_json)
+    terra_md_trim = terrautils.metadata.get_terraref_metadata(parse_json)
     if updated_experiment is not None:
         terra_md_trim['experiment_metadata'] = updated_experiment
     terra_md_trim['raw_data_source'] = filename
 
-    tiff_filename = os.path.splitext(os.path.basename(filename))[0] + '.tif'
+    tiff_filename = bin_stem + '.tif'
     tiff_path = os.path.join(working_space, tiff_filename)
 
     try:
         bin_shape = terraref.stereo_rgb.get_image_shape(terra_md_full, bin_type)
-        gps_bounds_bin = do_geojson_to_tuples(terra_md_full['spatial_metadata'][bin_type]['bounding_box'])
+        gps_bounds_bin = terrautils.spatial.geojson_to_tuples(
+            terra_md_full['spatial_metadata'][bin_type]['bounding_box'])
     except KeyError:
         msg = "Spatial metadata is not properly identified. Unable to continue"
         logging.error(msg)
@@ -172,9 +410,10 @@ def bin2tif(filename: str, metadata: str, working_space: str) -> dict:
     }
 
     # Perform actual processing
-    new_image = terraref.stereo_rgb.process_raw(bin_shape, filename, None)
-    do_create_geotiff(new_image, gps_bounds_bin, tiff_path, None, True,
-                      extractor_info, terra_md_full, compress=True)
+    new_image = convert_bin(bin_shape, filename, buffer_slot)
+    (geotiff_writer or write_geotiff)(image=new_image, gps_bounds=gps_bounds_bin, tiff_path=tiff_path,
+                                      compression=compression, extractor_info=extractor_info,
+                                      terra_md=terra_md_full)
 
 #        level1_md = build_metadata(host, self.extractor_info, target_dsid, terra_md_trim, 'dataset')
     context = ['https://clowder.ncsa.illinois.edu/contexts/metadata.jsonld']
@@ -206,6 +445,99 @@ def bin2tif(filename: str, metadata: str, working_space: str) -> dict:
     result['code'] = 0
     return result
 
+def _batch_geotiff_writer(work_queue: queue.Queue, codes: dict) -> None:
+    """Writes the geotiffs and saves the results queued by process_batch_items() until None is queued
+    Arguments:
+        work_queue: the queue of (index, params, result, geotiff arguments) to process; the geotiff
+                    arguments are None when there's nothing to write
+        codes: receives the result code of each item keyed by its index
+    """
+    while True:
+        work = work_queue.get()
+        if work is None:
+            break
+        index, params, result, geotiff_args = work
+        if geotiff_args:
+            try:
+                write_geotiff(**geotiff_args)
+            except Exception as ex:
+                msg = "Exception caught writing '%s': %s" % (geotiff_args['tiff_path'], str(ex))
+                logging.error(msg)
+                result = {'error': {'message': msg}, 'code': -6}
+
+        try:
+            save_result(params['working_space'], result)
+        except Exception as ex:
+            logging.error("Exception caught saving the result for '%s': %s", params['filename'], str(ex))
+        codes[index] = result['code']
+
+def process_batch_items(batch_params: list, num_threads: int = None) -> list:
+    """Converts the bin files one after the other, writing the geotiffs on a separate thread so that
+       writing one file overlaps converting the next. The result of each conversion is saved to its
+       working space
+    Arguments:
+        batch_params: the list of parameters to pass to bin2tif() for each bin file
+        num_threads: optional limit on the number of threads GDAL and Numba can use in this process
+    Return:
+        Returns the list of result codes in the same order as the parameters
+    """
+    # Set before the first conversion imports stereo_rgb_fast, Numba reads its thread count on import
+    if num_threads:
+        os.environ['GDAL_NUM_THREADS'] = str(num_threads)
+        os.environ['NUMBA_NUM_THREADS'] = str(num_threads)
+
+    codes = {}
+    work_queue = queue.Queue(maxsize=BATCH_WRITE_QUEUE_SIZE)
+    writer = threading.Thread(target=_batch_geotiff_writer, args=(work_queue, codes))
+    writer.start()
+
+    try:
+        for index, params in enumerate(batch_params):
+            # Images can be queued, being written, and being converted at the same time so each needs its own buffer
+            pending_writes = []
+            try:
+                result = bin2tif(**params, geotiff_writer=lambda **kwargs: pending_writes.append(kwargs),
+                                 buffer_slot=index % (BATCH_WRITE_QUEUE_SIZE + 2))
+            except Exception as ex:
+                msg = "Exception caught converting '%s': %s" % (params['filename'], str(ex))
+                logging.error(msg)
+                result = {'error': {'message': msg}, 'code': -6}
+                pending_writes.clear()
+
+            work_queue.put((index, params, result, pending_writes[0] if pending_writes else None))
+    finally:
+        work_queue.put(None)
+        writer.join()
+
+    return [codes.get(index, -6) for index in range(len(batch_params))]
+
+def process_batch(manifest: str, compression: str) -> None:
+    """Converts the bin files listed in the manifest in parallel. Each line of the manifest has
+       the bin file, metadata file, and working space to use. The result of each conversion is saved
+       to its working space
+    Arguments:
+        manifest: the path to the manifest file
+        compression: the compression to use for the geotiffs
+    """
+    batch_params = [{'filename': fields[0], 'metadata': fields[1], 'working_space': fields[2],
+                     'compression': compression} for fields in load_batch_manifest(manifest, 3, 3)]
+    logging.info("Converting %s bin files from manifest '%s'", str(len(batch_params)), manifest)
+
+    # Give each worker process its share of the files to convert in turn
+    num_cpus = os.cpu_count() or 1
+    num_workers = max(1, min(num_cpus, len(batch_params)))
+    worker_params = [batch_params[worker::num_workers] for worker in range(num_workers)]
+    # Split the CPUs between the workers so they don't use more threads than there are CPUs
+    worker_threads = [max(1, num_cpus // num_workers)] * num_workers
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+        worker_codes = list(executor.map(process_batch_items, worker_params, worker_threads))
+
+    failed = [params['filename'] for params_list, codes in zip(worker_params, worker_codes)
+              for params, code in zip(params_list, codes) if code != 0]
+    if failed:
+        logging.warning("Unable to convert %s of %s bin files: %s", str(len(failed)), str(len(batch_params)),
+                        str(failed))
+
 def do_work(parser) -> None:
     """Function to prepare and execute work unit
     Arguments:
@@ -222,18 +554,34 @@ def do_work(parser) -> None:
                         default=logging.WARN, const=logging.INFO,
                         help='enable info logging (default=WARN)')
 
-    parser.add_argument('bin_file', type=str, help='full path to the bin file to convert')
+    parser.add_argument('--compress', choices=COMPRESSION_TYPES, default=COMPRESSION_TYPES[0],
+                        help='the compression to use for the geotiff (default=%s)' % COMPRESSION_TYPES[0])
+
+    parser.add_argument('--batch', '-b', metavar='MANIFEST', default=None,
+                        help='convert the files listed in the manifest instead; each line of the manifest has a ' +
+                        'bin file, metadata file, and working space')
 
-    parser.add_argument('metadata_file', type=str, help='full path to the cleaned metadata')
+    parser.add_argument('bin_file', type=str, nargs='?', help='full path to the bin file to convert')
 
-    parser.add_argument('working_space', type=str, help='the folder to use use as a workspace and for storing results')
+    parser.add_argument('metadata_file', type=str, nargs='?', help='full path to the cleaned metadata')
+
+    parser.add_argument('working_space', type=str, nargs='?',
+                        help='the folder to use use as a workspace and for storing results')
 
     args = parser.parse_args()
+    if not args.batch and not args.working_space:
+        parser.error("the bin file, metadata file, and working space are required when not using --batch")
+
+    from pyclowder.utils import setup_logging as do_setup_logging
 
     # start logging system
     do_setup_logging(args.logging)
     logging.getLogger().setLevel(args.debug if args.debug == logging.DEBUG else args.info)
 
+    if args.batch:
+        process_batch(args.batch, args.compress)
+        return
+
     params_dict = args_to_params(args)
     logging.debug("Calling bin2tif() with the following parameters: %s", str(params_dict))
     result = bin2tif(**params_dict)
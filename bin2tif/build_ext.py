@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""Builds the stereo_kernels extension module containing the ahead of time compiled
+   demosaic kernel used by stereo_rgb_fast
+"""
+
+import os
+
+from numba.pycc import CC
+
+from stereo_rgb_fast import _DEMOSAIC_SIGNATURE, _bayer_grbg_to_rgb
+
+def build(output_dir: str = None) -> None:
+    """Compiles the stereo_kernels extension module
+    Arguments:
+        output_dir: the folder to write the extension to, defaults to the folder of this script
+    """
+    compiler = CC('stereo_kernels')
+    compiler.output_dir = output_dir or os.path.dirname(os.path.abspath(__file__))
+    compiler.export('bayer_grbg_to_rgb', _DEMOSAIC_SIGNATURE)(_bayer_grbg_to_rgb)
+    compiler.compile()
+
+if __name__ == "__main__":
+    build()
@@ -0,0 +1,169 @@
+"""Numba compiled replacement for terraref.stereo_rgb.process_raw()
+"""
+
+import ctypes
+import ctypes.util
+import mmap
+import os
+import sys
+
+# Numba reads the thread count when it's imported
+os.environ.setdefault('NUMBA_NUM_THREADS', str(os.cpu_count()))
+
+import numpy as np
+from numba import njit, prange, types
+
+# Linux madvise() hint for memory we read front to back
+MADV_SEQUENTIAL = 2
+
+def _advise_sequential(buf: np.ndarray) -> None:
+    """Hints to the kernel that the memory mapped buffer will be read sequentially. Only
+       available on Linux, it's silently skipped elsewhere
+    Arguments:
+        buf: the memory mapped array
+    """
+    if not sys.platform.startswith('linux') or not buf.size:
+        return
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc.madvise(ctypes.c_void_p(buf.ctypes.data), ctypes.c_size_t(buf.nbytes), MADV_SEQUENTIAL)
+    except (OSError, AttributeError):
+        pass
+
+# The raw bytes come from a read-only memory map
+_DEMOSAIC_SIGNATURE = types.void(types.Array(types.uint8, 2, 'C', readonly=True), types.Array(types.uint8, 3, 'C'))
+
+# Weights of the 3x3 demosaic filters indexed by the neighbor offset (0 is the center pixel).
+# The red/blue filter is [[1,2,1],[2,4,2],[1,2,1]] and green is [[0,1,0],[1,4,1],[0,1,0]],
+# both are divided by 4 to match terraref.stereo_rgb.demosaic()
+@njit(inline='always', boundscheck=False)
+def _demosaic_edge_pixel(raw, y, x, out):
+    """Demosaics a pixel on the edge of the image. Neighbors outside the image are reflected back
+       into it, matching the default 'reflect' mode of scipy.ndimage.convolve()
+    Arguments:
+        raw: the (height, width) BayerGR8 image
+        y: the row of the pixel
+        x: the column of the pixel
+        out: the (width, height, 3) array to receive the rotated RGB image
+    """
+    height, width = raw.shape
+    red = 0
+    green = 0
+    blue = 0
+    for d_y in range(-1, 2):
+        # With a 3x3 filter reflecting only ever maps -1 to 0 and the row past the end to the last one
+        n_y = min(max(y + d_y, 0), height - 1)
+        for d_x in range(-1, 2):
+            n_x = min(max(x + d_x, 0), width - 1)
+            value = np.int64(raw[n_y, n_x])
+            if (n_y & 1) == (n_x & 1):
+                # Green pixel
+                if d_y == 0 and d_x == 0:
+                    green += 4 * value
+                elif d_y == 0 or d_x == 0:
+                    green += value
+            else:
+                weight = (2 - abs(d_y)) * (2 - abs(d_x))
+                if (n_y & 1) == 0:
+                    red += weight * value
+                else:
+                    blue += weight * value
+    out[width - 1 - x, y, 0] = red // 4
+    out[width - 1 - x, y, 1] = green // 4
+    out[width - 1 - x, y, 2] = blue // 4
+
+def _bayer_grbg_to_rgb(raw, out):
+    """Demosaics a BayerGR8 image and rotates it 90 degrees counter-clockwise to match
+       terraref.stereo_rgb.process_raw()
+    Arguments:
+        raw: the (height, width) BayerGR8 image
+        out: the (width, height, 3) array to receive the RGB image
+    """
+    height, width = raw.shape
+    for y in prange(height):
+        if y == 0 or y == height - 1:
+            for x in range(width):
+                _demosaic_edge_pixel(raw, y, x, out)
+            continue
+
+        _demosaic_edge_pixel(raw, y, 0, out)
+        _demosaic_edge_pixel(raw, y, width - 1, out)
+        # Interior pixels have all their neighbors so the filters reduce to simple averages
+        for x in range(1, width - 1):
+            center = np.int64(raw[y, x])
+            up_down = np.int64(raw[y - 1, x]) + np.int64(raw[y + 1, x])
+            left_right = np.int64(raw[y, x - 1]) + np.int64(raw[y, x + 1])
+            diagonals = np.int64(raw[y - 1, x - 1]) + np.int64(raw[y - 1, x + 1]) + \
+                        np.int64(raw[y + 1, x - 1]) + np.int64(raw[y + 1, x + 1])
+            if (y & 1) == 0:
+                if (x & 1) == 0:
+                    # Green pixel on a red row
+                    red = left_right // 2
+                    green = center
+                    blue = up_down // 2
+                else:
+                    # Red pixel
+                    red = center
+                    green = (up_down + left_right) // 4
+                    blue = diagonals // 4
+            else:
+                if (x & 1) == 0:
+                    # Blue pixel
+                    red = diagonals // 4
+                    green = (up_down + left_right) // 4
+                    blue = center
+                else:
+                    # Green pixel on a blue row
+                    red = up_down // 2
+                    green = center
+                    blue = left_right // 2
+            out[width - 1 - x, y, 0] = red
+            out[width - 1 - x, y, 1] = green
+            out[width - 1 - x, y, 2] = blue
+
+# Use the ahead of time compiled kernel built by build_ext.py when it's available to avoid compiling at startup
+try:
+    from stereo_kernels import bayer_grbg_to_rgb
+except ImportError:
+    bayer_grbg_to_rgb = njit(_DEMOSAIC_SIGNATURE, parallel=True, fastmath=True, boundscheck=False,
+                             cache=True)(_bayer_grbg_to_rgb)
+
+def process_raw(shape: tuple, input_path: str, out_path: str = None, out: np.ndarray = None) -> np.ndarray:
+    """Converts a raw stereo bin file to an RGB image
+    Arguments:
+        shape: the (width, height) of the raw image as returned by terraref.stereo_rgb.get_image_shape()
+        input_path: the path to the .bin file
+        out_path: optional path to save the RGB image to
+        out: optional contiguous uint8 array of shape (width, height, 3) to write the RGB image into;
+             every pixel is overwritten
+    Return:
+        Returns the RGB image rotated to match terraref.stereo_rgb.process_raw()
+    """
+    width, height = shape
+    if out is None:
+        im_color = np.empty((width, height, 3), np.uint8)
+    elif out.shape != (width, height, 3) or out.dtype != np.uint8 or not out.flags.c_contiguous:
+        raise ValueError("Output array must be a contiguous uint8 array of shape %s" % str((width, height, 3)))
+    else:
+        im_color = out
+
+    # Map the bin file instead of reading it so pages are loaded as the kernel walks through them
+    with open(input_path, 'rb') as in_file:
+        file_size = os.fstat(in_file.fileno()).st_size
+        if file_size != width * height:
+            raise ValueError("Bin file '%s' has %d bytes, expected %d" % (input_path, file_size, width * height))
+        mapped = mmap.mmap(in_file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        buf = np.frombuffer(mapped, dtype=np.uint8)
+        _advise_sequential(buf)
+        bayer_grbg_to_rgb(buf.reshape((height, width)), im_color)
+    finally:
+        # The array must be released before the mapping can be closed
+        buf = None
+        mapped.close()
+
+    if out_path:
+        from PIL import Image
+        Image.fromarray(im_color).save(out_path)
+
+    return im_color
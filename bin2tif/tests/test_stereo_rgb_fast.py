@@ -0,0 +1,95 @@
+"""Tests that the Numba bin conversion matches terraref.stereo_rgb
+"""
+
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip('numpy')
+ndimage = pytest.importorskip('scipy.ndimage')
+pytest.importorskip('numba')
+
+# terraref is only compared against when it's installed, the reference below follows its demosaic()
+try:
+    from terraref import stereo_rgb
+except ImportError:
+    stereo_rgb = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import stereo_rgb_fast  # pylint: disable=wrong-import-position
+
+TEST_SIZES = [(1, 1), (2, 2), (3, 2), (6, 4), (7, 5), (5, 1), (1, 5), (2, 9), (64, 33), (330, 247)]
+
+
+def reference_process_raw(raw: np.ndarray) -> np.ndarray:
+    """Demosaics and rotates the BayerGR8 image the same way terraref.stereo_rgb.process_raw() does
+    Arguments:
+        raw: the (height, width) BayerGR8 image
+    Return:
+        Returns the rotated RGB image
+    """
+    red, green, blue = np.zeros_like(raw), np.zeros_like(raw), np.zeros_like(raw)
+    red[0::2, 1::2] = raw[0::2, 1::2]
+    blue[1::2, 0::2] = raw[1::2, 0::2]
+    green[0::2, 0::2] = raw[0::2, 0::2]
+    green[1::2, 1::2] = raw[1::2, 1::2]
+
+    filter_g = np.asarray([[0, 1, 0], [1, 4, 1], [0, 1, 0]]) / 4.0
+    filter_rb = np.asarray([[1, 2, 1], [2, 4, 2], [1, 2, 1]]) / 4.0
+
+    im_color = np.zeros(raw.shape + (3,), dtype='uint8')
+    im_color[:, :, 0] = ndimage.convolve(red, filter_rb, mode='reflect')
+    im_color[:, :, 1] = ndimage.convolve(green, filter_g, mode='reflect')
+    im_color[:, :, 2] = ndimage.convolve(blue, filter_rb, mode='reflect')
+    return np.rot90(im_color)
+
+
+def write_raw(tmp_path, width: int, height: int) -> tuple:
+    """Writes a random BayerGR8 image to a bin file
+    Return:
+        Returns the path to the bin file and the (height, width) image
+    """
+    raw = np.random.default_rng(width * 1000 + height).integers(0, 256, width * height, dtype=np.uint8)
+    bin_path = str(tmp_path / 'image_left.bin')
+    raw.tofile(bin_path)
+    return bin_path, raw.reshape((height, width))
+
+
+@pytest.mark.parametrize('width,height', TEST_SIZES)
+def test_process_raw_matches_reference(tmp_path, width, height):
+    """Checks every pixel, including the border, against the reference demosaic and rotation
+    """
+    bin_path, raw = write_raw(tmp_path, width, height)
+
+    expected = reference_process_raw(raw)
+    converted = stereo_rgb_fast.process_raw((width, height), bin_path)
+
+    assert converted.shape == expected.shape
+    assert np.array_equal(converted, expected)
+
+
+@pytest.mark.skipif(stereo_rgb is None, reason="terraref.stereo_rgb is not installed")
+@pytest.mark.parametrize('width,height', TEST_SIZES)
+def test_process_raw_matches_terraref(tmp_path, width, height):
+    """Checks every pixel against terraref's own demosaic and rotation
+    """
+    bin_path, raw = write_raw(tmp_path, width, height)
+
+    expected = np.rot90(stereo_rgb.demosaic(raw))
+    converted = stereo_rgb_fast.process_raw((width, height), bin_path)
+
+    assert np.array_equal(converted, expected)
+
+
+def test_process_raw_fills_buffer(tmp_path):
+    """Checks that a provided output buffer is filled and returned
+    """
+    width, height = 8, 6
+    bin_path, raw = write_raw(tmp_path, width, height)
+
+    out = np.zeros((width, height, 3), np.uint8)
+    converted = stereo_rgb_fast.process_raw((width, height), bin_path, out=out)
+
+    assert converted is out
+    assert np.array_equal(out, reference_process_raw(raw))
@@ -2,22 +2,98 @@
 """Cleans up metadata from sensors
 """
 import argparse
+import concurrent.futures
+import copy
+import functools
 import os
 import json
 import logging
+import shlex
 
-from pyclowder.utils import setup_logging as do_setup_logging
-from terrautils.extractors import load_json_file as do_load_json_file
-from terrautils.metadata import clean_metadata as do_clean_metadata
-import terrautils.lemnatec
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-terrautils.lemnatec.SENSOR_METADATA_CACHE = os.path.dirname(os.path.realpath(__file__))
+# The terrautils and pyclowder modules are slow to load and are imported by the functions that use them
+
+# Folder containing the sensor metadata used by terrautils
+SENSOR_METADATA_FOLDER = os.path.dirname(os.path.abspath(__file__))
+
+def _memoize_sensor_fixed_metadata() -> None:
+    """Replaces the terrautils sensor fixed metadata lookup with one that only loads and parses
+       each sensor's metadata file once. Callers receive a copy so the cached metadata can't be changed.
+       Calling this again after the lookup has been replaced does nothing
+    """
+    import terrautils.lemnatec
+
+    loader = getattr(terrautils.lemnatec, '_get_sensor_fixed_metadata', None)
+    if loader is None:
+        logging.debug("Sensor fixed metadata lookup not found, it won't be cached")
+        return
+    if getattr(loader, 'is_memoized', False):
+        return
+
+    cached_loader = functools.lru_cache(maxsize=32)(loader)
+
+    @functools.wraps(loader)
+    def get_sensor_fixed_metadata(sensor_id, query_date):
+        return copy.deepcopy(cached_loader(sensor_id, query_date))
+    get_sensor_fixed_metadata.is_memoized = True
+
+    terrautils.lemnatec._get_sensor_fixed_metadata = get_sensor_fixed_metadata
 
 SELF_DESCRIPTION = "Maricopa agricultural gantry metadata cleaner"
 
 # List of sensors that cannot be cleaned
 SKIP_SENSORS = ['Full Field']
 
+def _fast_load_json(filename: str):
+    """Loads the JSON from the file, using orjson for local files when it's available
+    Arguments:
+        filename: the path of the JSON file to load
+    Return:
+        Returns the loaded JSON, or None if the file couldn't be loaded
+    """
+    from terrautils.extractors import load_json_file as do_load_json_file
+
+    if not orjson or not os.path.isfile(filename):
+        return do_load_json_file(filename)
+
+    try:
+        with open(filename, 'rb') as in_file:
+            return orjson.loads(in_file.read())
+    except orjson.JSONDecodeError:
+        # orjson rejects NaN and Infinity which the standard json module accepts
+        logging.debug("Falling back to the standard JSON loader for '%s'", filename)
+        return do_load_json_file(filename)
+    except OSError as ex:
+        logging.error("Could not load JSON file '%s': %s", filename, str(ex))
+    return None
+
+def write_json_file(path: str, data: dict, skipkeys: bool = False, indent: bool = True) -> None:
+    """Writes the data to the file as JSON, using orjson when it's available
+    Arguments:
+        path: the path of the file to write
+        data: the data to write
+        skipkeys: skip dictionary keys that aren't basic types instead of raising an exception
+        indent: write indented JSON when True, compact JSON otherwise
+    """
+    if orjson:
+        options = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_NON_STR_KEYS if skipkeys else 0)
+        try:
+            encoded = orjson.dumps(data, option=options)
+        except orjson.JSONEncodeError:
+            # Fall back to json for keys or values orjson can't handle (such as tuple keys to skip)
+            encoded = None
+        if encoded is not None:
+            with open(path, 'wb') as out_file:
+                out_file.write(encoded)
+            return
+
+    with open(path, 'w') as out_file:
+        json.dump(data, out_file, indent=2 if indent else None, skipkeys=skipkeys)
+
 def save_result(working_space: str, result: dict) -> None:
     """Saves the result dictionary as JSON to a well known location in the
        working space folder. Relative to the working space folder, the JSON
@@ -26,15 +102,13 @@ def save_result(working_space: str, result: dict) -> None:
         working_space: path to our working space
         result: dictionary containing the results of a run
     """
-    result_path = os.path.join(working_space, 'output')
-    if not os.path.exists(result_path):
-        os.makedirs(result_path)
-    result_path = os.path.join(result_path, 'result.json')
+    os.makedirs(os.path.join(working_space, 'output'), exist_ok=True)
+    result_path = os.path.join(working_space, 'output', 'result.json')
     logging.info("Storing result at location: '%s'", result_path)
-    logging.debug("Result: %s", str(result))
+    logging.debug("Result: %r", result)
 
-    with open(result_path, 'w') as out_file:
-        json.dump(result, out_file, indent=2)
+    # Only make the results easy to read when debugging
+    write_json_file(result_path, result, indent=logging.getLogger().isEnabledFor(logging.DEBUG))
 
 def args_to_params(args: list) -> dict:
     """Looks through the arguments and returns a dict with the found values.
@@ -53,13 +127,39 @@ def args_to_params(args: list) -> dict:
     # Note: Return an empty dict if we're missing mandatory parameters
     return found
 
-def clean_metadata(sensor: str, filename: str, working_space: str, userid: str = None) -> dict:
+def load_batch_manifest(manifest: str, min_fields: int, max_fields: int) -> list:
+    """Loads the lines of a batch manifest file. Each line has the fields of one work item, separated by
+       whitespace with shell style quoting. Blank lines and lines starting with '#' are ignored
+    Arguments:
+        manifest: the path to the manifest file
+        min_fields: the minimum number of fields on a line
+        max_fields: the maximum number of fields on a line
+    Return:
+        Returns the list of fields found on each valid line
+    """
+    items = []
+    with open(manifest, 'r') as in_file:
+        for line_num, line in enumerate(in_file, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = shlex.split(line)
+            if not min_fields <= len(fields) <= max_fields:
+                logging.error("Skipping manifest line %s: expected %s to %s fields, found %s",
+                              str(line_num), str(min_fields), str(max_fields), str(len(fields)))
+                continue
+            items.append(fields)
+    return items
+
+def clean_metadata(sensor: str, filename: str, working_space: str, userid: str = None,
+                   return_metadata: bool = False) -> dict:
     """Cleans the metadata from the file passed in and adds context.
     Arguments:
         sensor: the name of the sensor the metadata is assciated with
         filename: the path to the metadata file to clean
         working_space: the path to our working space
         userid: optional user identification string to add to metadata
+        return_metadata: when True the cleaned metadata is also returned in the result's 'metadata' key
     Return:
         Returns the file location of the converted metadata
     """
@@ -91,8 +191,13 @@ def clean_metadata(sensor: str, filename: str, working_space: str, userid: str =
 #        if sensor_type == "scanner3DTop":
 #            source_dir = source_dir.replace("Level_1", "raw_data").replace("laser3d_las", "scanner3DTop")
 
+    from terrautils.metadata import clean_metadata as do_clean_metadata
+    import terrautils.lemnatec
+    terrautils.lemnatec.SENSOR_METADATA_CACHE = SENSOR_METADATA_FOLDER
+    _memoize_sensor_fixed_metadata()
+
     # Load our base metadata
-    loaded_json = do_load_json_file(filename)
+    loaded_json = _fast_load_json(filename)
     if not loaded_json:
         logging.error("Unable to load JSON from file '%s'", filename)
         logging.error("    JSON may be missing or invalid. Returning an error")
@@ -125,19 +230,66 @@ def clean_metadata(sensor: str, filename: str, working_space: str, userid: str =
     new_filename = filename_parts[0] + '_cleaned' + filename_parts[1]
     new_path = os.path.join(working_space, new_filename)
     logging.info("Saving cleaned metadata to file '%s'", new_path)
-    logging.debug("Cleaned metadata '%s'", str(format_md))
+    logging.debug("Cleaned metadata '%s'", format_md)
 
-    with open(new_path, 'w') as out_file:
-        json.dump(format_md, out_file, indent=2, skipkeys=True)
+    write_json_file(new_path, format_md, skipkeys=True)
 
     result['file'] = [{
         'path': new_path,
         'key': sensor
         }]
+    if return_metadata:
+        result['metadata'] = format_md
     result['code'] = 0
 
     return result
 
+def process_batch_item(params: dict) -> int:
+    """Cleans one metadata file of a batch and saves its result to its working space
+    Arguments:
+        params: the parameters to pass to clean_metadata()
+    Return:
+        Returns the result code
+    """
+    try:
+        result = clean_metadata(**params)
+    except Exception as ex:
+        msg = "Exception caught cleaning '%s': %s" % (params['filename'], str(ex))
+        logging.error(msg)
+        result = {'error': {'message': msg}, 'code': -2}
+
+    # Don't let one unwritable working space stop the rest of the batch
+    try:
+        save_result(params['working_space'], result)
+    except Exception as ex:
+        logging.error("Exception caught saving the result for '%s': %s", params['filename'], str(ex))
+        return result['code'] if result['code'] != 0 else -3
+    return result['code']
+
+def process_batch(manifest: str) -> None:
+    """Cleans the metadata files listed in the manifest in parallel. Each line of the manifest has
+       the sensor, metadata file, working space, and an optional user ID. The result of each cleaning
+       is saved to its working space
+    Arguments:
+        manifest: the path to the manifest file
+    """
+    batch_params = []
+    for fields in load_batch_manifest(manifest, 3, 4):
+        params = {'sensor': fields[0], 'filename': fields[1], 'working_space': fields[2]}
+        if len(fields) > 3:
+            params['userid'] = fields[3]
+        batch_params.append(params)
+    logging.info("Cleaning %s metadata files from manifest '%s'", str(len(batch_params)), manifest)
+
+    # Cleaning is single threaded so one worker per CPU is enough, but don't start more workers than files
+    num_workers = max(1, min(os.cpu_count() or 1, len(batch_params)))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers) as executor:
+        codes = list(executor.map(process_batch_item, batch_params))
+
+    failed = [params['filename'] for params, code in zip(batch_params, codes) if code != 0]
+    if failed:
+        logging.warning("Unable to clean %s of %s metadata files: %s", str(len(failed)), str(len(codes)), str(failed))
+
 def do_work(parser) -> None:
     """Function to prepare and execute work unit
     """
@@ -152,21 +304,34 @@ def do_work(parser) -> None:
                         default=logging.WARN, const=logging.INFO,
                         help='enable info logging (default=WARN)')
 
-    parser.add_argument('sensor', type=str, help='the name of the sensor')
+    parser.add_argument('--batch', '-b', metavar='MANIFEST', default=None,
+                        help='clean the files listed in the manifest instead; each line of the manifest has a ' +
+                        'sensor, metadata file, working space, and optional user ID')
+
+    parser.add_argument('sensor', type=str, nargs='?', help='the name of the sensor')
 
-    parser.add_argument('filename', type=str, help='full file path to the metadata')
+    parser.add_argument('filename', type=str, nargs='?', help='full file path to the metadata')
 
-    parser.add_argument('working_space', type=str, help='the folder to use use as a workspace and for storing results')
+    parser.add_argument('working_space', type=str, nargs='?',
+                        help='the folder to use use as a workspace and for storing results')
 
     parser.add_argument('userid', type=str, nargs='?',
                         help='an optional user identification string to be added to the metadata')
 
     args = parser.parse_args()
+    if not args.batch and not args.working_space:
+        parser.error("the sensor, metadata file, and working space are required when not using --batch")
+
+    from pyclowder.utils import setup_logging as do_setup_logging
 
     # start logging system
     do_setup_logging(args.logging)
     logging.getLogger().setLevel(args.debug if args.debug == logging.DEBUG else args.info)
 
+    if args.batch:
+        process_batch(args.batch)
+        return
+
     params_dict = args_to_params(args)
     logging.debug("Calling clean_metadata() with the following parameters: %s", str(params_dict))
     result = clean_metadata(**params_dict)
@@ -8,7 +8,16 @@ import json
 import logging
 import sys
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from pyclowder.utils import setup_logging as do_setup_logging
+import terrautils.betydb
 from terrautils.betydb import get_cultivars as do_get_cultivars, \
                               get_experiments as do_get_experiments, \
                               get_sites as do_get_sites, \
@@ -19,6 +28,41 @@ SELF_DESCRIPTION = "Fetches data from the TERRA REF BETYdb instance"
 BETYDB_URL = "https://terraref.ncsa.illinois.edu/bety/"
 BETYDB_KEY = "9999999999999999999999999999999999999999"
 
+# terrautils.betydb reads the location and key from the environment
+os.environ['BETYDB_URL'] = BETYDB_URL
+os.environ['BETYDB_KEY'] = BETYDB_KEY
+
+def use_pooled_session() -> None:
+    """Has the terrautils BETYdb calls share a session that keeps its connections open between requests
+       and retries failed requests
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=Retry(total=3, backoff_factor=0.3))
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    # terrautils.betydb only calls requests.get() and requests.post(), which the session provides
+    terrautils.betydb.requests = session
+
+def write_data(data) -> None:
+    """Writes the data to standard output as JSON, using orjson when it's available. The JSON is
+       only indented when writing to a terminal, compact JSON is written when piped or redirected
+    Arguments:
+        data: the data to write
+    """
+    indent = sys.stdout.isatty()
+    if orjson:
+        options = orjson.OPT_APPEND_NEWLINE | (orjson.OPT_INDENT_2 if indent else 0)
+        sys.stdout.flush()
+        sys.stdout.buffer.write(orjson.dumps(data, option=options))
+        sys.stdout.buffer.flush()
+    else:
+        # Write the JSON as it's encoded instead of building one large string first
+        if hasattr(sys.stdout, 'reconfigure'):
+            sys.stdout.reconfigure(line_buffering=False)
+        json.dump(data, sys.stdout, indent=2 if indent else None)
+        sys.stdout.write('\n')
+        sys.stdout.flush()
+
 def do_work(parser) -> dict:
     """Fetch the data from BETYdb
     Arguments:
@@ -56,9 +100,8 @@ def do_work(parser) -> dict:
         logging.error("    Stopping processing")
         return result['code']
 
-    os.environ['BETYDB_URL'] = BETYDB_URL
-    os.environ['BETYDB_KEY'] = BETYDB_KEY
     logging.debug("Calling BETYdb at location: %s", BETYDB_URL)
+    use_pooled_session()
 
     opts = {}
     if args.options:
@@ -82,7 +125,7 @@ def do_work(parser) -> dict:
 
     if args.datatype in type_map:
         data = type_map[args.datatype]()
-        print(json.dumps(data, indent=2))
+        write_data(data)
     else:
         result['error'] = "Invalid datatype parameter specifed: '%s'. Stopping processing" % str(args.datatype)
         result['code'] = -2
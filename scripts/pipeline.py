@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Cleans stereoTop metadata and converts the .bin files to geotiff in one step
+"""
+
+import argparse
+import os
+import logging
+import sys
+
+# Look for the extractors next to this script's folder when they're not installed alongside it
+SCRIPT_FOLDER = os.path.dirname(os.path.abspath(__file__))
+for extractor_folder in ['bin2tif', 'metadata_cleaner']:
+    extractor_path = os.path.join(os.path.dirname(SCRIPT_FOLDER), extractor_folder)
+    if os.path.isdir(extractor_path) and extractor_path not in sys.path:
+        sys.path.append(extractor_path)
+
+# pylint: disable=wrong-import-position
+from pyclowder.utils import setup_logging as do_setup_logging
+import bin2tif
+import metadata_cleaner
+
+SELF_DESCRIPTION = "Maricopa agricultural gantry metadata cleaner and bin to geotiff converter"
+
+def pipeline(sensor: str, metadata: str, bin_files: list, working_space: str, userid: str = None,
+             compression: str = bin2tif.COMPRESSION_TYPES[0]) -> dict:
+    """Cleans the metadata and converts the bin files to geotiffs using the cleaned metadata without
+       reloading it from disk
+    Arguments:
+        sensor: the name of the sensor the metadata is assciated with
+        metadata: the path to the metadata file to clean
+        bin_files: the paths to the .bin files to convert
+        working_space: the path to our working space
+        userid: optional user identification string to add to metadata
+        compression: the compression to use for the geotiffs
+    Return:
+        Returns the combined results of the cleaning and conversions
+    """
+    result = metadata_cleaner.clean_metadata(sensor, metadata, working_space, userid, return_metadata=True)
+    cleaned_md = result.pop('metadata', None)
+    if result['code'] != 0:
+        return result
+    if not cleaned_md:
+        msg = "No cleaned metadata available for sensor '%s', unable to convert bin files" % sensor
+        logging.error(msg)
+        result['error'] = {'message': msg}
+        result['code'] = -1
+        return result
+
+    result['container'] = []
+    for one_file in bin_files:
+        bin_result = bin2tif.bin2tif_from_dict(one_file, cleaned_md, working_space, compression)
+        if bin_result['code'] != 0:
+            result['error'] = bin_result['error']
+            result['code'] = bin_result['code']
+            return result
+        result['container'].extend(bin_result['container'])
+
+    return result
+
+def do_work(parser) -> None:
+    """Function to prepare and execute work unit
+    Arguments:
+        parser: an instance of argparse.ArgumentParser
+    """
+    parser.add_argument('--logging', '-l', nargs='?', default=os.getenv("LOGGING"),
+                        help='file or url or logging configuration (default=None)')
+
+    parser.add_argument('--debug', '-d', action='store_const',
+                        default=logging.WARN, const=logging.DEBUG,
+                        help='enable debug logging (default=WARN)')
+
+    parser.add_argument('--info', '-i', action='store_const',
+                        default=logging.WARN, const=logging.INFO,
+                        help='enable info logging (default=WARN)')
+
+    parser.add_argument('--sensor', '-s', default=bin2tif.EXTRACTOR_NAME,
+                        help='the name of the sensor (default=%s)' % bin2tif.EXTRACTOR_NAME)
+
+    parser.add_argument('--userid', '-u', default=None,
+                        help='an optional user identification string to be added to the metadata')
+
+    parser.add_argument('--compress', choices=bin2tif.COMPRESSION_TYPES, default=bin2tif.COMPRESSION_TYPES[0],
+                        help='the compression to use for the geotiffs (default=%s)' % bin2tif.COMPRESSION_TYPES[0])
+
+    parser.add_argument('metadata_file', type=str, help='full path to the metadata to clean')
+
+    parser.add_argument('working_space', type=str, help='the folder to use use as a workspace and for storing results')
+
+    parser.add_argument('bin_file', type=str, nargs='+', help='full path to a bin file to convert')
+
+    args = parser.parse_args()
+
+    # start logging system
+    do_setup_logging(args.logging)
+    logging.getLogger().setLevel(args.debug if args.debug == logging.DEBUG else args.info)
+
+    result = pipeline(args.sensor, args.metadata_file, args.bin_file, args.working_space, args.userid, args.compress)
+
+    # Save the result to a well known location
+    logging.debug("Saving the result to the working space: '%s'", args.working_space)
+    bin2tif.save_result(args.working_space, result)
+
+
+if __name__ == "__main__":
+    try:
+        PARSER = argparse.ArgumentParser(description=SELF_DESCRIPTION,
+                                         epilog="The cleaned metadata and geotiffs are written to the working " +
+                                         "space, and the results are written off the working space in " +
+                                         "'output/result.json'")
+        do_work(PARSER)
+    except Exception as ex:
+        logging.error("Top level exception handler caught an exception: %s", str(ex))
+        raise